@@ -1,7 +1,13 @@
+# eventlet must patch the stdlib (socket, threading, time) before anything else imports it
+import eventlet
+eventlet.monkey_patch()
+
 import os
 import sys
+import math
 import threading
 import logging
+from collections import deque
 from flask import Flask, render_template, request, jsonify
 from flask_socketio import SocketIO
 
@@ -28,40 +34,121 @@ app.logger.setLevel(logger.level)
 socketio = SocketIO(
     app,
     cors_allowed_origins="*",
-    async_mode="threading",
+    async_mode="eventlet",
     logger=False,
     engineio_logger=False
 )
 
 # --- Constants ---
 DEFAULT_CERT_DIR = "certs"
+EMIT_BATCH_INTERVAL = 0.1  # seconds between batched reading emits
+EMIT_BATCH_HIGH_WATER = 50  # flush immediately once this many readings are buffered
+
+MIN_INTERVAL_SECONDS = 1.0  # matches min="1" on the configuration form inputs
+
+
+def valid_interval(value):
+    """Interval bounds must be finite and at least MIN_INTERVAL_SECONDS."""
+    return math.isfinite(value) and value >= MIN_INTERVAL_SECONDS
+
+
+def valid_port(value):
+    """MQTT port must be a valid TCP port number."""
+    return 0 < value < 65536
+
+
+# (config key, form field, type, required, value check) for the /configuration POST
+CONFIG_FORM_SCHEMA = (
+    ("interval_consumed_lower", "consumed_lower", float, True, valid_interval),
+    ("interval_consumed_upper", "consumed_upper", float, True, valid_interval),
+    ("interval_generated_lower", "generated_lower", float, True, valid_interval),
+    ("interval_generated_upper", "generated_upper", float, True, valid_interval),
+    ("mqtt_host", "mqtt_host", str, False, None),
+    ("mqtt_port", "mqtt_port", int, True, valid_port),
+    ("mqtt_username", "mqtt_username", str, False, None),
+    ("mqtt_password", "mqtt_password", str, False, None),
+)
+
+# (lower key, upper key, upper form field) bounds that must satisfy lower <= upper
+INTERVAL_BOUND_PAIRS = (
+    ("interval_consumed_lower", "interval_consumed_upper", "consumed_upper"),
+    ("interval_generated_lower", "interval_generated_upper", "generated_upper"),
+)
 
 # --- Utilities ---
-publish_and_emit_lock = threading.Lock()
+connected_clients = 0
+connected_clients_lock = threading.Lock()
+
+
+def track_client(delta):
+    """Adjust the connected SocketIO client count on connect (+1) / disconnect (-1)."""
+    global connected_clients
+    with connected_clients_lock:
+        connected_clients = max(connected_clients + delta, 0)
 
 
 def safe_emit(event, data):
-    """Emit safely to SocketIO clients; ignore minor failures."""
+    """Emit safely to SocketIO clients; ignore minor failures. No-op without clients."""
+    if not connected_clients:
+        return
     try:
         socketio.emit(event, data)
     except Exception:
         logger.exception("❌ Failed to emit message to clients")
 
 
+# --- Reading batching ---
+reading_buffer = deque()
+reading_buffer_lock = threading.Lock()
+
+
+def flush_readings():
+    """Swap out buffered readings and emit them to clients as a single batch."""
+    global reading_buffer
+    with reading_buffer_lock:
+        if not reading_buffer:
+            return
+        batch, reading_buffer = reading_buffer, deque()
+    safe_emit("meter_reading_batch", list(batch))
+
+
+def queue_reading(payload):
+    """Buffer a reading for the next batched emit; flush early past the high-water mark."""
+    if not connected_clients:
+        return  # nobody is watching, don't buffer
+    with reading_buffer_lock:
+        reading_buffer.append(payload)
+        flush_now = len(reading_buffer) >= EMIT_BATCH_HIGH_WATER
+    if flush_now:
+        flush_readings()
+
+
+def reading_flusher():
+    """Background task emitting buffered readings every EMIT_BATCH_INTERVAL seconds."""
+    while True:
+        socketio.sleep(EMIT_BATCH_INTERVAL)
+        flush_readings()
+
+
 def get_config_template_vars(cfg):
-    """Prepare config values for template rendering."""
-    return {
-        "consumed_lower": cfg.get("interval_consumed_lower", 2.0),
-        "consumed_upper": cfg.get("interval_consumed_upper", 5.0),
-        "generated_lower": cfg.get("interval_generated_lower", 2.0),
-        "generated_upper": cfg.get("interval_generated_upper", 5.0),
-        "mqtt_publish_enabled": cfg.get("mqtt_publish_enabled", True),
-        "mqtt_host": cfg.get("mqtt_host", ""),
-        "mqtt_port": cfg.get("mqtt_port", 8883),
-        "mqtt_username": cfg.get("mqtt_username", ""),
-        "mqtt_password": cfg.get("mqtt_password", ""),
-        "mqtt_cert_filename": cfg.get("mqtt_cert_filename", "")
-    }
+    """Prepare config values for template rendering, filling gaps from the defaults."""
+    return {**ConfigManager.DEFAULT_CONFIG, **cfg}
+
+
+def parse_config_form(form):
+    """Parse the configuration form via CONFIG_FORM_SCHEMA; return (config, invalid fields)."""
+    new_config = {key: form.get(field, type=cast) for key, field, cast, _, _ in CONFIG_FORM_SCHEMA}
+    invalid = []
+    for key, field, _, required, check in CONFIG_FORM_SCHEMA:
+        value = new_config[key]
+        if (value is None and required) or (value is not None and check and not check(value)):
+            invalid.append(field)
+    for lower_key, upper_key, upper_field in INTERVAL_BOUND_PAIRS:
+        lower, upper = new_config[lower_key], new_config[upper_key]
+        if lower is not None and upper is not None and lower > upper and upper_field not in invalid:
+            invalid.append(upper_field)
+    new_config["mqtt_publish_enabled"] = form.get("mqtt_publish_enabled", "false").lower() == "true"
+    return new_config, invalid
 
 
 # --- Initialization ---
@@ -94,7 +181,7 @@ def init_data_sources(cfg, callback):
 
 
 def apply_config(new_cfg, consumer, generator, mqtt_mgr):
-    """Update intervals and restart MQTT client with new config."""
+    """Update intervals; restart MQTT client only if its connection settings changed."""
     try:
         logger.info("🔄 Applying new configuration...")
         consumer.interval_lower_bound = new_cfg["interval_consumed_lower"]
@@ -102,9 +189,13 @@ def apply_config(new_cfg, consumer, generator, mqtt_mgr):
         generator.interval_lower_bound = new_cfg["interval_generated_lower"]
         generator.interval_upper_bound = new_cfg["interval_generated_upper"]
 
-        mqtt_mgr.stopClient()
+        restart = mqtt_mgr.needsRestart(new_cfg)
         mqtt_mgr.config = new_cfg
-        mqtt_mgr.startClient()
+        if not restart:
+            logger.info("ℹ️ MQTT settings unchanged, keeping current client.")
+            return
+
+        mqtt_mgr.startClient()  # stops the previous client first
     except Exception:
         logger.exception("❌ Error applying configuration")
 
@@ -133,13 +224,14 @@ def main():
     config_manager, config = init_config()
     mqtt_manager = init_mqtt(config)
 
-    # Callback for publishing data
+    # Callback for publishing data (paho publish and the reading buffer are
+    # thread-safe, so data source threads don't serialize on each other here)
     def publish_callback(payload):
-        with publish_and_emit_lock:
-            mqtt_manager.safePublish(payload)
-            safe_emit("meter_reading", payload)
+        mqtt_manager.safePublish(payload)
+        queue_reading(payload)
 
-    # Start data sources
+    # Start batched emitter and data sources
+    socketio.start_background_task(reading_flusher)
     energy_consumer, energy_generator = init_data_sources(config, publish_callback)
     energy_consumer.start()
     energy_generator.start()
@@ -165,6 +257,11 @@ def main():
         if request.method == "GET":
             return render_template("configuration.html", **get_config_template_vars(config_manager.all()))
 
+        new_config, invalid = parse_config_form(request.form)
+        if invalid:
+            logger.warning(f"⚠️ Rejected configuration, invalid fields: {invalid}")
+            return jsonify({"message": f"❌ Invalid or missing fields: {', '.join(invalid)}"}), 400
+
         uploaded_cert = request.files.get("mqtt_cert")
         cert_filename = None
         if uploaded_cert:
@@ -172,19 +269,7 @@ def main():
                 cert_filename = config_manager.save_cert_file(uploaded_cert, cert_dir=DEFAULT_CERT_DIR)
             except Exception:
                 logger.warning("⚠️ Could not save uploaded certificate; keeping previous one.")
-
-        new_config = {
-            "interval_consumed_lower": request.form.get("consumed_lower", type=float),
-            "interval_consumed_upper": request.form.get("consumed_upper", type=float),
-            "interval_generated_lower": request.form.get("generated_lower", type=float),
-            "interval_generated_upper": request.form.get("generated_upper", type=float),
-            "mqtt_publish_enabled": request.form.get("mqtt_publish_enabled", "false").lower() == "true",
-            "mqtt_host": request.form.get("mqtt_host"),
-            "mqtt_port": request.form.get("mqtt_port", type=int),
-            "mqtt_username": request.form.get("mqtt_username"),
-            "mqtt_password": request.form.get("mqtt_password"),
-            "mqtt_cert_filename": cert_filename or config_manager.get("mqtt_cert_filename", "")
-        }
+        new_config["mqtt_cert_filename"] = cert_filename or config_manager.get("mqtt_cert_filename", "")
 
         config_manager.update(new_config)
         logger.info("✅ Configuration updated successfully")
@@ -197,6 +282,14 @@ def main():
         return jsonify({"connected": connected})
 
     # --- SocketIO events ---
+    @socketio.on("connect")
+    def handle_connect():
+        track_client(1)
+
+    @socketio.on("disconnect")
+    def handle_disconnect():
+        track_client(-1)
+
     @socketio.on("control_action")
     def handle_control_action(data):
         action = data.get("action")
@@ -204,7 +297,7 @@ def main():
 
     # Start server
     logger.info("🚀 Starting Flask + SocketIO server...")
-    socketio.run(app, host="0.0.0.0", port=5000, allow_unsafe_werkzeug=True)
+    socketio.run(app, host="0.0.0.0", port=5000)
 
 
 if __name__ == "__main__":
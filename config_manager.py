@@ -1,11 +1,13 @@
 import os
-import json
 import threading
 import traceback
 import logging
+from types import MappingProxyType
+import orjson
 
 # --- Constants ---
 DEFAULT_CERT_DIR = "certs"
+NOTIFY_DEBOUNCE_SECONDS = 0.05  # updates within this window trigger a single listener call
 
 class ConfigManager:
     DEFAULT_CONFIG = {
@@ -23,44 +25,65 @@ class ConfigManager:
 
     def __init__(self, config_file="config.json"):
         self.config_file = config_file
-        self._lock = threading.RLock()
+        self._lock = threading.Lock()  # guards _config, _view and _listeners; never held across I/O
+        self._save_lock = threading.Lock()  # serializes writes to config_file
         self._config = None
+        self._view = MappingProxyType({})  # read-only view of _config, replaced on every change
         self._listeners = []
+        self._notify_timer = None  # pending coalesced listener notification
+        self._last_payload = None  # bytes last read from / written to config_file
         self._logger = logging.getLogger()
         self.load()
 
     def load(self):
         """Load config from file or create default if missing."""
+        config = None
+        if os.path.exists(self.config_file):
+            try:
+                with self._save_lock, open(self.config_file, "rb") as f:
+                    self._last_payload = f.read()
+                config = orjson.loads(self._last_payload)
+            except Exception:
+                self._logger.warning(
+                    "⚠️ Failed to read config, using defaults:\n%s", traceback.format_exc()
+                )
+
+        needs_save = config is None
+        if needs_save:
+            config = self.DEFAULT_CONFIG.copy()
         with self._lock:
-            if not os.path.exists(self.config_file):
-                self._config = self.DEFAULT_CONFIG.copy()
-                self.save()
-            else:
-                try:
-                    with open(self.config_file, "r") as f:
-                        self._config = json.load(f)
-                except Exception:
-                    self._logger.warning(
-                        "⚠️ Failed to read config, using defaults:\n%s", traceback.format_exc()
-                    )
-                    self._config = self.DEFAULT_CONFIG.copy()
-                    self.save()
-        return self._config
+            self._config = config
+            self._view = MappingProxyType(config)
+        if needs_save:
+            self._save_snapshot(config)
+        return self._view
 
     def save(self):
-        """Save current config to file."""
-        with self._lock:
+        """Save current config to file, skipping the write if nothing changed."""
+        self._save_snapshot(self._config)
+
+    def _save_snapshot(self, snapshot):
+        """Write a config snapshot to file unless a newer one has superseded it."""
+        with self._save_lock:
+            if snapshot is not self._config:
+                return  # a later update() owns the write
             try:
+                payload = orjson.dumps(snapshot, option=orjson.OPT_INDENT_2)
+                if payload == self._last_payload:
+                    self._logger.info("ℹ️ Config unchanged, skipping save.")
+                    return
                 self._logger.info("💾 Attempting to save config...")
-                with open(self.config_file, "w") as f:
-                    json.dump(self._config, f, indent=4)
+                with open(self.config_file, "wb") as f:
+                    f.write(payload)
+                self._last_payload = payload
                 self._logger.info("✅ Config saved successfully.")
             except Exception:
                 self._logger.exception("❌ Failed to save config")
 
     def save_cert_file(self, cert_file, cert_dir=DEFAULT_CERT_DIR):
         """
-        Save an uploaded certificate file and update config with its filename.
+        Save an uploaded certificate file. The caller records the returned
+        filename in its own update(), so the upload costs no extra save.
         :param cert_file: werkzeug FileStorage object
         :param cert_dir: directory to save the cert
         :return: filename of saved cert or None
@@ -72,33 +95,50 @@ class ConfigManager:
         cert_path = os.path.join(cert_dir, cert_file.filename)
         try:
             cert_file.save(cert_path)
-            self.update({"mqtt_cert_filename": cert_file.filename})
             self._logger.info("✅ Certificate saved: %s", cert_path)
             return cert_file.filename
         except Exception:
             self._logger.exception("❌ Failed to save certificate")
             return self.get("mqtt_cert_filename", None)
 
+    # Config dicts are copy-on-write: once published through _view they are never
+    # mutated, so readers can use the current view without taking the lock.
     def get(self, key, default=None):
-        with self._lock:
-            return self._config.get(key, default)
+        return self._view.get(key, default)
 
     def all(self):
-        with self._lock:
-            return self._config.copy()
+        """Return a read-only view of the current config."""
+        return self._view
 
     def update(self, updates: dict):
+        # Publish the new config under the lock, then write outside it so readers
+        # never wait on disk I/O. Listeners are notified once per debounce window.
+        with self._lock:
+            new_config = dict(self._config)
+            new_config.update(updates)
+            self._config = new_config
+            self._view = MappingProxyType(new_config)
+            if self._notify_timer is None:
+                self._notify_timer = threading.Timer(NOTIFY_DEBOUNCE_SECONDS, self._notify_listeners)
+                self._notify_timer.daemon = True
+                self._notify_timer.start()
+
+        self._save_snapshot(new_config)
+
+    def _notify_listeners(self):
+        """Call listeners once with the latest config, coalescing recent updates."""
         with self._lock:
-            self._config.update(updates)
-            self.save()
+            self._notify_timer = None
+            view = self._view
+            listeners = tuple(self._listeners)
 
-        # Notify listeners outside the lock
-        for listener in self._listeners:
+        for listener in listeners:
             try:
-                listener(self._config)
+                listener(view)
             except Exception as e:
                 self._logger.warning("⚠️ Config listener error: %s", e)
 
     def on_change(self, callback):
         if callable(callback):
-            self._listeners.append(callback)
\ No newline at end of file
+            with self._lock:
+                self._listeners.append(callback)
@@ -2,16 +2,38 @@ import random
 import threading
 import time
 import socket
-from datetime import datetime
+import functools
 import logging
 import traceback
 
 
+@functools.lru_cache(maxsize=1)
+def get_local_ip():
+    """Retrieve the local IP address of the device (probed once, then cached)."""
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect(("8.8.8.8", 80))
+            return s.getsockname()[0]
+    except Exception:
+        pass
+    try:
+        return socket.gethostbyname(socket.gethostname())
+    except Exception:
+        logging.getLogger().warning("⚠️ Failed to get local IP, defaulting to 127.0.0.1")
+        return "127.0.0.1"
+
+
 class DataSource:
     """
     Simulates a mock energy meter that generates voltage, current, and power readings.
     """
 
+    __slots__ = (
+        "name", "timestamp", "voltage", "current", "power", "ipAddr",
+        "interval_lower_bound", "interval_upper_bound", "callback",
+        "_logger", "_thread_started", "_paused", "_wake", "_stop", "_random",
+    )
+
     def __init__(self, name="Generic DS", interval_lower_bound=2, interval_upper_bound=2, callback=None):
         """
         :param interval_lower_bound: Minimum sleep interval between readings (seconds)
@@ -23,36 +45,31 @@ class DataSource:
         self.voltage = 0.0
         self.current = 0.0
         self.power = 0.0
-        self.ipAddr = self._get_ip_address()
+        self.ipAddr = get_local_ip()
         self.interval_lower_bound = interval_lower_bound
         self.interval_upper_bound = interval_upper_bound
-        self.running = True
         self.callback = callback
         self._logger = logging.getLogger()
         self._thread_started = False
-
-    def _get_ip_address(self):
-        """Retrieve the local IP address of the device."""
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.connect(("8.8.8.8", 80))
-            ip = s.getsockname()[0]
-            s.close()
-            return ip
-        except Exception:
-            self._logger.warning("⚠️ Failed to get local IP, defaulting to 127.0.0.1")
-            return "127.0.0.1"
+        self._paused = threading.Event()  # set while running, cleared while paused
+        self._paused.set()
+        self._wake = threading.Event()  # interrupts the sleep between readings
+        self._stop = threading.Event()
+        self._random = random.Random().random  # per-source RNG, bound once
 
     def generate_readings(self):
         """Simulate realistic voltage, current, and power readings."""
-        self.voltage = round(random.uniform(210, 240), 2)
-        self.current = round(random.uniform(0.1, 10.0), 2)
+        # Inlined uniform(a, b) = a + (b - a) * random() to skip the wrapper call
+        rand = self._random
+        self.voltage = round(210 + 30 * rand(), 2)
+        self.current = round(0.1 + 9.9 * rand(), 2)
         self.power = round(self.voltage * self.current, 2)
-        self.timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self._logger.info(
-            f"[{self.name}] Reading: "
-            f"V={self.voltage}V, I={self.current}A, P={self.power}W at {self.timestamp}"
-        )
+        self.timestamp = time.time_ns() // 1_000_000  # epoch ms, formatted client-side
+        if self._logger.isEnabledFor(logging.INFO):
+            self._logger.info(
+                "[%s] Reading: V=%sV, I=%sA, P=%sW at %s",
+                self.name, self.voltage, self.current, self.power, self.timestamp
+            )
 
     def start(self):
         """Start the thread only once."""
@@ -67,46 +84,55 @@ class DataSource:
 
     def pause(self):
         """Pause readings without stopping the thread."""
-        self.running = False
+        self._paused.clear()
+        self._wake.set()
         self._logger.info("⏸️ [%s] DataSource paused.", self.name)
 
 
     def resume(self):
         """Resume readings."""
-        self.running = True
+        self._paused.set()
         self._logger.info("▶️ [%s] DataSource resumed.", self.name)
 
 
     def stop(self):
         """Stop the data generation loop."""
-        self.running = False
+        self._stop.set()
+        self._paused.set()  # unblock a paused loop so it can exit
+        self._wake.set()
         self._logger.info("🛑 [%s] DataSource stopped.", self.name)
 
 
     def _run(self):
         """Main loop for generating readings at random intervals."""
-        while True:
+        while not self._stop.is_set():
             try:
-                if self.running:
-                    self.generate_readings()
-                    if self.callback:
-                        try:
-                            self.callback({
-                                "voltage": self.voltage,
-                                "current": self.current,
-                                "power": self.power,
-                                "ipAddr": self.ipAddr,
-                                "timestamp": self.timestamp
-                            })
-                        except Exception:
-                            self._logger.exception("⚠️ [%s] Callback error", self.name)
-
-                sleep_time = random.uniform(self.interval_lower_bound, self.interval_upper_bound)
+                self._paused.wait()  # blocks without waking while paused
+                if self._stop.is_set():
+                    break
+                self._wake.clear()  # a wake left over from pause() must not skip the next sleep
+
+                self.generate_readings()
+                if self.callback:
+                    try:
+                        self.callback({
+                            "voltage": self.voltage,
+                            "current": self.current,
+                            "power": self.power,
+                            "ipAddr": self.ipAddr,
+                            "timestamp": self.timestamp
+                        })
+                    except Exception:
+                        self._logger.exception("⚠️ [%s] Callback error", self.name)
+
+                lower = self.interval_lower_bound
+                sleep_time = lower + (self.interval_upper_bound - lower) * self._random()
                 current_thread = threading.current_thread()
                 self._logger.debug(
                     "[%s] Thread ID: %s, Name: %s, sleeping for %.2fs",
                     self.name, current_thread.ident, current_thread.name, sleep_time
                 )
-                time.sleep(sleep_time)
+                self._wake.wait(timeout=sleep_time)
+                self._wake.clear()
             except Exception:
-                self._logger.exception("❌ [%s] DataSource error", self.name)
\ No newline at end of file
+                self._logger.exception("❌ [%s] DataSource error", self.name)
@@ -1,14 +1,20 @@
 import os
 import ssl
-import json
+import queue
 import threading
 import logging
 import traceback
+import orjson
 import paho.mqtt.client as mqtt
 
 DEFAULT_CERT_DIR = "certs"
 PUB_TOPIC = "mock/energy_meter/id001/data"
 SUB_TOPIC = "mock/energy_meter/id001/control"
+OUTBOX_MAX_SIZE = 100  # queued readings beyond this drop the oldest
+# Recognized control payloads, matched on raw bytes without decoding
+CONTROL_COMMANDS = {b"PAUSE": "PAUSE", b"RESUME": "RESUME"}
+# Config keys that need a client restart when changed; mqtt_publish_enabled is read per publish
+CONNECTION_KEYS = ("mqtt_host", "mqtt_port", "mqtt_username", "mqtt_password", "mqtt_cert_filename")
 
 class MqttManager:
     """
@@ -25,115 +31,199 @@ class MqttManager:
         self._logger = logging.getLogger()
         self._lock = threading.RLock()
         self.mqtt_client = None
+        self._connected = False  # cached from paho callbacks; avoids is_connected() per publish
+        self._outbox = queue.Queue(maxsize=OUTBOX_MAX_SIZE)
+        self._publisher_thread = None
+        self._client_signature = None  # connection settings the current client was started with
 
     def startClient(self):
-        """Start MQTT client with TLS, credentials, and subscriptions."""
+        """Start MQTT client with TLS, credentials, and subscriptions.
+
+        The connection is made asynchronously on paho's network thread and the
+        previous client is shut down after the lock is released, so the lock is
+        only held to swap clients, never across broker I/O.
+        """
+        host = self.config.get("mqtt_host")
+        port = self.config.get("mqtt_port", 8883)
+        if not host:
+            self.stopClient()
+            self._logger.warning("⚠️ MQTT host not configured. Skipping MQTT startup.")
+            return None
+
+        signature = self._connection_signature(self.config)
+        client_id = f"mock-meter-{os.urandom(4).hex()}"
+        client = mqtt.Client(client_id=client_id, clean_session=True)
+        client.enable_logger()
+        client.reconnect_delay_set(min_delay=1, max_delay=2)
+        client.max_inflight_messages_set(20)
+
+        # Set username/password if provided
+        username = self.config.get("mqtt_username")
+        password = self.config.get("mqtt_password")
+        if username or password:
+            client.username_pw_set(username or "", password or "")
+
+        # TLS setup
+        cert_filename = self.config.get("mqtt_cert_filename") or ""
+        cert_path = os.path.join(DEFAULT_CERT_DIR, cert_filename)
+        if cert_filename and os.path.exists(cert_path):
+            try:
+                client.tls_set(
+                    ca_certs=cert_path,
+                    certfile=None,
+                    keyfile=None,
+                    cert_reqs=ssl.CERT_REQUIRED,
+                    tls_version=ssl.PROTOCOL_TLS,
+                )
+                client.tls_insecure_set(True)
+                self._logger.info("🔐 TLS enabled using cert: %s", cert_path)
+            except Exception:
+                self._logger.exception("❌ Failed to set TLS")
+        else:
+            self._logger.info("ℹ️ No MQTT certificate found. Connecting without TLS.")
+
+        # Assign MQTT event handlers
+        client.on_connect = self._on_connect
+        client.on_disconnect = self._on_disconnect
+        client.on_message = self._on_message
+        client.on_log = lambda c, u, l, b: self._logger.debug("📝 MQTT LOG: %s", b)
+
+        # Swap clients and schedule the connect
         with self._lock:
-            self.stopClient()  # Clean up any previous client
-
-            host = self.config.get("mqtt_host")
-            port = self.config.get("mqtt_port", 8883)
-            if not host:
-                self._logger.warning("⚠️ MQTT host not configured. Skipping MQTT startup.")
-                return None
-
-            client_id = f"mock-meter-{os.urandom(4).hex()}"
-            client = mqtt.Client(client_id=client_id, clean_session=True)
-            client.enable_logger()
-            client.reconnect_delay_set(min_delay=1, max_delay=2)
-            client.max_inflight_messages_set(20)
-
-            # Set username/password if provided
-            username = self.config.get("mqtt_username")
-            password = self.config.get("mqtt_password")
-            if username or password:
-                client.username_pw_set(username or "", password or "")
-
-            # TLS setup
-            cert_filename = self.config.get("mqtt_cert_filename") or ""
-            cert_path = os.path.join(DEFAULT_CERT_DIR, cert_filename)
-            if cert_filename and os.path.exists(cert_path):
-                try:
-                    client.tls_set(
-                        ca_certs=cert_path,
-                        certfile=None,
-                        keyfile=None,
-                        cert_reqs=ssl.CERT_REQUIRED,
-                        tls_version=ssl.PROTOCOL_TLS,
-                    )
-                    client.tls_insecure_set(True)
-                    self._logger.info("🔐 TLS enabled using cert: %s", cert_path)
-                except Exception:
-                    self._logger.exception("❌ Failed to set TLS")
-            else:
-                self._logger.info("ℹ️ No MQTT certificate found. Connecting without TLS.")
-
-            # Assign MQTT event handlers
-            client.on_connect = self._on_connect
-            client.on_disconnect = self._on_disconnect
-            client.on_message = self._on_message
-            client.on_log = lambda c, u, l, b: self._logger.debug("📝 MQTT LOG: %s", b)
-
-            # Connect
+            old_client = self._detach_client()
+            self._start_publisher()
             try:
-                client.connect(host, int(port), 60)
-                client.loop_start()
+                client.connect_async(host, int(port), 60)
                 self.mqtt_client = client
-                self._logger.info("✅ Connected to MQTT broker %s:%s (Client ID: %s)", host, port, client_id)
+                self._client_signature = signature
+                client.loop_start()
+                self._logger.info("🔌 Connecting to MQTT broker %s:%s (Client ID: %s)", host, port, client_id)
             except Exception:
                 self._logger.exception("❌ MQTT connection failed")
                 self.mqtt_client = None
+            new_client = self.mqtt_client
 
-            return self.mqtt_client
+        self._shutdown_client(old_client)
+        return new_client
 
     def stopClient(self):
         """Stop and clean up any existing client."""
+        if self.mqtt_client is None:
+            return
         with self._lock:
-            try:
-                if self.mqtt_client:
-                    self.mqtt_client.loop_stop()
-                    self.mqtt_client.disconnect()
-                    self._logger.info("🛑 MQTT client stopped.")
-            except Exception:
-                self._logger.exception("⚠️ MQTT stop failed")
-            finally:
-                self.mqtt_client = None
+            old_client = self._detach_client()
+        self._shutdown_client(old_client)
+
+    def _detach_client(self):
+        """Clear the current client and its state; caller must hold the lock."""
+        old_client = self.mqtt_client
+        self.mqtt_client = None
+        self._connected = False
+        self._client_signature = None
+        self._drain_outbox()
+        return old_client
 
-    def safePublish(self, payload):
-        """Safely publish JSON or text payload if connected."""
+    def _shutdown_client(self, client):
+        """Stop a detached client's network loop and disconnect it, outside the lock.
+
+        loop_stop() joins paho's network thread, which may be stuck in a slow
+        reconnect; late callbacks from the old client are ignored.
+        """
+        if client is None:
+            return
+        try:
+            client.loop_stop()
+            client.disconnect()
+            self._logger.info("🛑 MQTT client stopped.")
+        except Exception:
+            self._logger.exception("⚠️ MQTT stop failed")
+
+    def needsRestart(self, config):
+        """Check whether config's connection settings differ from the running client's."""
+        return self.mqtt_client is None or self._connection_signature(config) != self._client_signature
+
+    @staticmethod
+    def _connection_signature(config):
+        """Connection settings plus cert mtime, so a re-uploaded cert of the same name counts as a change."""
+        cert_path = os.path.join(DEFAULT_CERT_DIR, config.get("mqtt_cert_filename") or "")
+        cert_mtime = os.path.getmtime(cert_path) if os.path.isfile(cert_path) else None
+        return tuple(config.get(key) for key in CONNECTION_KEYS) + (cert_mtime,)
+
+    def safePublish(self, payload: dict):
+        """Queue a dict payload for the publisher thread if publishing is enabled and connected."""
         if not self.config.get("mqtt_publish_enabled", False):
             return
-        if not self.mqtt_client or not self.mqtt_client.is_connected():
+        if not self._connected or not self.mqtt_client:
             self._logger.warning("⚠️ MQTT client is null or not connected")
             return
         try:
-            mqtt_payload = (
-                json.dumps(payload).encode("utf-8")
-                if isinstance(payload, dict)
-                else str(payload).encode("utf-8")
+            self._outbox.put_nowait(payload)
+        except queue.Full:
+            # Backpressure: drop the oldest reading rather than grow without bound
+            try:
+                self._outbox.get_nowait()
+                self._outbox.put_nowait(payload)
+            except (queue.Empty, queue.Full):
+                pass
+            self._logger.warning("⚠️ MQTT outbox full, dropped oldest reading")
+
+    def _start_publisher(self):
+        """Start the outbox publisher thread once."""
+        if self._publisher_thread is None:
+            self._publisher_thread = threading.Thread(
+                target=self._publish_loop, daemon=True, name="MQTT-Publisher"
             )
-            self._logger.info(f"🚀 MQTT Outbound: {mqtt_payload}")
-            self.mqtt_client.publish(PUB_TOPIC, mqtt_payload)
-        except Exception:
-            self._logger.exception("💣 MQTT publish error")
+            self._publisher_thread.start()
+
+    def _drain_outbox(self):
+        """Discard queued readings so they are not sent to a replaced client."""
+        try:
+            while True:
+                self._outbox.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _publish_loop(self):
+        """Encode and publish queued payloads off the data source threads."""
+        while True:
+            payload = self._outbox.get()
+            client = self.mqtt_client
+            if not self._connected or not client:
+                continue
+            try:
+                mqtt_payload = orjson.dumps(payload)
+                if self._logger.isEnabledFor(logging.DEBUG):
+                    self._logger.debug("🚀 MQTT Outbound: %s", mqtt_payload)
+                result = client.publish(PUB_TOPIC, mqtt_payload)
+                if result.rc != mqtt.MQTT_ERR_SUCCESS:
+                    self._logger.warning("⚠️ MQTT publish not queued: %s", mqtt.error_string(result.rc))
+            except Exception:
+                self._logger.exception("💣 MQTT publish error")
 
     def isConnected(self):
         """Check connection state."""
-        return self.mqtt_client and self.mqtt_client.is_connected()
+        return self._connected
 
     # --- MQTT Event Handlers ---
     def _on_connect(self, client, userdata, flags, rc):
+        if client is not self.mqtt_client:  # replaced while its loop was still shutting down
+            return
         if rc == 0:
+            self._connected = True
             self._logger.info("✅ Connected to MQTT broker.")
             client.subscribe(SUB_TOPIC)
         else:
             self._logger.warning("❌ MQTT connect failed: rc=%s", rc)
 
     def _on_disconnect(self, client, userdata, rc):
+        if client is self.mqtt_client:  # ignore late callbacks from a replaced client
+            self._connected = False
         self._logger.warning("⚠️ MQTT disconnected (rc=%s)", rc)
 
     def _on_message(self, client, userdata, msg):
-        payload = msg.payload.decode()
+        payload = CONTROL_COMMANDS.get(msg.payload.strip().upper())
+        if payload is None:
+            payload = msg.payload.decode(errors="replace")
         self._logger.info("📩 MQTT Received: %s", payload)
         if self.message_callback:
             try:
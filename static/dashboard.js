@@ -78,7 +78,7 @@ for (const key in chartConfigs) {
 let latestConsumed = { voltage: 0, current: 0, power: 0 };
 let latestGenerated = { voltage: 0, current: 0, power: 0 };
 
-function updateDashboard(data) {
+function updateDashboard(data, redraw = true) {
   if (!data) return;
 
   const newConsumed = data.consumed ?? null;
@@ -136,12 +136,15 @@ function updateDashboard(data) {
 
     // chart.options.spanGaps = true;
 
-    chart.update('active');
+    if (redraw) chart.update('active');
   });
 }
 
-// Socket listener
-socket.on('meter_reading', data => updateDashboard(data));
+// Socket listener: readings arrive in batches, redraw charts once per batch
+socket.on('meter_reading_batch', batch => {
+  if (!Array.isArray(batch)) return;
+  batch.forEach((data, i) => updateDashboard(data, i === batch.length - 1));
+});
 
 // Controls
 function sendAction(action) {